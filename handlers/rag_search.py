@@ -1,17 +1,21 @@
 # 导入操作系统相关功能的模块
 import os
+# 导入hmac模块，用于恒定时间的密钥比较
+import hmac
+# 导入heapq模块，用于按分数选取top-k结果
+import heapq
+# 导入numpy库，用于大结果集的向量化分数筛选
+import numpy as np
 # 导入类型提示相关的模块
 from typing import Optional
 # 导入Pydantic的BaseModel用于数据验证
 from pydantic import BaseModel
 # 导入FastAPI的路由器和请求头处理组件
 from fastapi import APIRouter, Header
+# 导入基于orjson的响应类，序列化速度远快于标准库json
+from fastapi.responses import ORJSONResponse
 # 导入搜索服务，用于获取搜索结果
 from services.search.serper import get_search_results
-# 导入LlamaIndex重排序服务，并重命名为get_rerank_llamaindex
-from services.rerank.llamaindex import get_rerank_results as get_rerank_llamaindex
-# 导入FlashRank重排序服务，并重命名为get_rerank_flashrank
-from services.rerank.flashrank import get_rerank_results as get_rerank_flashrank
 # 导入通用重排序服务
 from services.rerank.rerank import rerank
 # 导入文档存储服务
@@ -22,12 +26,44 @@ from services.document.query import query_results
 from services.web import batch_fetch_urls
 # 导入响应工具函数
 from utils.resp import resp_err, resp_data
+# 导入日志组件
+from components.log import log
 
 
 # 创建FastAPI路由器实例
 rag_router = APIRouter()
 
 
+# 缓存的认证API密钥，首次校验时从环境变量读取一次，避免每个请求都调用os.getenv
+_auth_api_key: Optional[bytes] = None
+
+# 响应中保留的搜索结果字段，裁剪冗余字段以减少序列化开销和响应体积
+_response_fields = ("title", "link", "snippet", "score", "content")
+
+
+def verify_authorization(authorization: Optional[str]) -> bool:
+    """
+    校验请求头中的Bearer API密钥
+
+    该方法在首次调用时缓存环境变量中的认证密钥，
+    之后的请求不再读取环境变量。密钥比较使用
+    hmac.compare_digest进行恒定时间比较，且只比较
+    "Bearer "前缀之后的部分，避免扫描整个请求头。
+    """
+    global _auth_api_key
+    # 首次校验时缓存密钥（环境变量在应用启动时已由init_env加载）
+    if _auth_api_key is None:
+        _auth_api_key = os.getenv("AUTH_API_KEY", "").encode()
+    # 密钥未配置时拒绝所有请求，避免空密钥与空Bearer头意外匹配
+    if not _auth_api_key:
+        return False
+    # 请求头必须存在且以"Bearer "开头
+    if not authorization or not authorization.startswith("Bearer "):
+        return False
+    # 恒定时间比较"Bearer "之后的密钥部分
+    return hmac.compare_digest(authorization[7:].encode(), _auth_api_key)
+
+
 # 定义RAG搜索请求的数据模型，继承自Pydantic的BaseModel
 class RagSearchReq(BaseModel):
     query: str                                    # 搜索查询字符串，必填字段
@@ -57,16 +93,8 @@ async def rag_search(req: RagSearchReq, authorization: str = Header(None)):
     5. 可选地过滤内容
     6. 返回处理后的搜索结果
     """
-    # 从环境变量获取认证API密钥
-    authApiKey = os.getenv("AUTH_API_KEY")
-    # 初始化API密钥变量
-    apiKey = ""
-    # 如果请求头中包含authorization字段
-    if authorization:
-        # 从authorization字段中提取API密钥，去除"Bearer "前缀
-        apiKey = authorization.replace("Bearer ", "")
-    # 验证API密钥是否匹配
-    if apiKey != authApiKey:
+    # 验证API密钥是否匹配（密钥已在模块内缓存，比较为恒定时间）
+    if not verify_authorization(authorization):
         # 如果不匹配，返回访问拒绝错误
         return resp_err("Access Denied")
 
@@ -90,10 +118,10 @@ async def rag_search(req: RagSearchReq, authorization: str = Header(None)):
         if req.is_reranking:
             try:
                 # 对搜索结果进行重排序
-                search_results = rerank(search_results, req.query)
+                search_results = await rerank(search_results, req.query)
             except Exception as e:
                 # 如果重排序失败，记录错误但继续执行
-                print(f"reranking search results failed: {e}")
+                log.error(f"reranking search results failed: {e}")
 
         # 3. 如果启用了详细内容获取
         if req.is_detail:
@@ -102,21 +130,27 @@ async def rag_search(req: RagSearchReq, authorization: str = Header(None)):
                 search_results = await fetch_details(search_results, req.detail_min_score, req.detail_top_k)
             except Exception as e:
                 # 如果获取详细内容失败，记录错误但继续执行
-                print(f"fetch search details failed: {e}")
+                log.error(f"fetch search details failed: {e}")
 
         # 4. 如果启用了内容过滤
         if req.is_filter:
             try:
                 # 过滤搜索结果内容
-                search_results = filter_content(search_results, req.query, req.filter_min_score, req.filter_top_k)
+                search_results = await filter_content(search_results, req.query, req.filter_min_score, req.filter_top_k)
             except Exception as e:
                 # 如果内容过滤失败，记录错误但继续执行
-                print(f"filter content failed: {e}")
+                log.error(f"filter content failed: {e}")
+
+        # 只保留客户端需要的字段，裁剪响应体积
+        trimmed_results = [
+            {key: result[key] for key in _response_fields if key in result}
+            for result in search_results
+        ]
 
-        # 返回处理后的搜索结果
-        return resp_data({
-            "search_results": search_results,
-        })
+        # 返回处理后的搜索结果（orjson序列化，比标准库json快数倍）
+        return ORJSONResponse(resp_data({
+            "search_results": trimmed_results,
+        }))
     except Exception as e:
         # 捕获并返回任何未处理的异常
         return resp_err(f"rag search failed: {e}")
@@ -149,7 +183,7 @@ def search(query, num, locale=''):
         return search_results
     except Exception as e:
         # 记录搜索失败的错误
-        print(f"search failed: {e}")
+        log.error(f"search failed: {e}")
         # 重新抛出异常
         raise e
 
@@ -162,46 +196,48 @@ async def fetch_details(search_results, min_score=0.00, top_k=6):
     并将内容添加到相应的搜索结果中。它根据分数阈值和结果数量限制
     来选择要获取详细内容的URL。
     """
-    # 初始化URL列表
-    urls = []
-    # 遍历搜索结果
-    for res in search_results:
-        # 如果已收集的URL数量超过top_k，停止收集
-        if len(urls) > top_k:
-            break
-        # 如果结果的分数大于等于最低分数阈值
-        if res["score"] >= min_score:
-            # 将结果的链接添加到URL列表
-            urls.append(res["link"])
+    if len(search_results) < 32:
+        # 小结果集走Python路径，避免numpy的固定开销
+        # 筛选出分数达到阈值的结果
+        eligible = (res for res in search_results if res.get("score", 0) >= min_score)
+        # 按分数选取前top_k个结果（O(N log k)），避免低分结果挤占高分结果的名额
+        top = heapq.nlargest(top_k, eligible, key=lambda res: res["score"])
+    else:
+        # 大结果集用numpy向量化筛选：一次性构建分数数组
+        scores = np.fromiter((res.get("score", 0.0) for res in search_results),
+                             dtype=np.float32, count=len(search_results))
+        # 标记分数达到阈值的结果
+        mask = scores >= min_score
+        k = min(top_k, len(scores))
+        # 不达标的分数置为负无穷，稳定排序后取前k个；
+        # 稳定排序保证同分结果维持原有名次（如未重排序时所有分数均为0）
+        masked = np.where(mask, scores, -np.inf)
+        idxs = np.argsort(-masked, kind="stable")[:k]
+        top = [search_results[i] for i in idxs if mask[i]]
+
+    # 提取链接并去重（重排序或翻页可能产生重复链接），保持分数排序
+    urls = list(dict.fromkeys(res["link"] for res in top))
 
     try:
         # 异步批量获取URL的内容
         details = await batch_fetch_urls(urls)
     except Exception as e:
         # 记录获取详细内容失败的错误
-        print(f"fetch details failed: {e}")
+        log.error(f"fetch details failed: {e}")
         # 重新抛出异常
         raise e
 
-    # 创建URL到内容的映射字典
-    content_maps = {}
-    # 遍历获取到的URL和内容对
+    # 构建链接到结果的映射，单次遍历把抓取到的内容直接回填到结果上
+    link_to_result = {result["link"]: result for result in search_results}
     for url, content in details:
-        # 将URL和内容添加到映射字典
-        content_maps[url] = content
-
-    # 遍历搜索结果
-    for result in search_results:
-        # 如果结果的链接在内容映射中
-        if result["link"] in content_maps:
-            # 将内容添加到结果中
-            result["content"] = content_maps[result["link"]]
+        if url in link_to_result:
+            link_to_result[url]["content"] = content
 
     # 返回更新后的搜索结果
     return search_results
 
 
-def filter_content(search_results, query, filter_min_score=0.8, filter_top_k=10):
+async def filter_content(search_results, query, filter_min_score=0.8, filter_top_k=10):
     """
     过滤搜索结果内容
     
@@ -219,35 +255,27 @@ def filter_content(search_results, query, filter_min_score=0.8, filter_top_k=10)
                 # 将结果添加到有内容的结果列表
                 results_with_content.append(result)
 
-        # 将有内容的结果存储到向量数据库中，返回索引
-        index = store_results(results=results_with_content)
+        # 将有内容的结果存储到向量数据库中（内部批量异步嵌入），返回索引
+        index = await store_results(results=results_with_content)
         # 查询向量数据库，获取与查询最相关的结果
         match_results = query_results(index, query, filter_min_score, filter_top_k)
 
     except Exception as e:
         # 记录内容过滤失败的错误
-        print(f"filter content failed: {e}")
+        log.error(f"filter content failed: {e}")
         # 重新抛出异常
         raise e
 
-    # 创建UUID到内容的映射字典
-    content_maps = {}
-    # 遍历匹配的结果
-    for result in match_results:
-        # 如果结果的UUID不在内容映射中
-        if result["uuid"] not in content_maps:
-            # 初始化该UUID的内容为空字符串
-            content_maps[result["uuid"]] = ""
-        else:
-            # 否则，将内容追加到该UUID的现有内容
-            content_maps[result["uuid"]] += result["content"]
-
-    # 遍历原始搜索结果
-    for result in search_results:
-        # 如果结果的UUID在内容映射中
-        if result["uuid"] in content_maps:
-            # 更新结果的内容
-            result["content"] = content_maps[result["uuid"]]
+    # 构建UUID到结果的映射，单次遍历把匹配到的内容直接回填到结果上
+    uuid_to_result = {result["uuid"]: result for result in search_results}
+    # 遍历匹配的结果（query_results已保证每个UUID只返回最佳分块）
+    for match in match_results:
+        result = uuid_to_result.get(match["uuid"])
+        # 匹配结果不在原始搜索结果中时跳过
+        if result is None:
+            continue
+        # 用最佳分块内容替换原有内容，避免拼接分块导致提示词膨胀
+        result["content"] = match["content"]
 
     # 返回更新后的搜索结果
     return search_results
\ No newline at end of file
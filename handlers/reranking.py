@@ -26,7 +26,7 @@ async def reranking(req: RerankReq, authorization: str = Header(None)):
         return resp_err("invalid params")
 
     try:
-        search_results = rerank(req.search_results, req.query)
+        search_results = await rerank(req.search_results, req.query)
 
         return resp_data({
             "reranking_results": search_results,
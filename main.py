@@ -4,6 +4,7 @@ from components.log import init_log, log
 from components.env import init_env
 from handlers.rag_search import rag_router
 from handlers.reranking import reranking_router
+from services.web import close_session
 
 
 def startup():
@@ -23,6 +24,7 @@ def shutdown():
 async def lifespan(app: FastAPI):
     startup()
     yield
+    await close_session()
     shutdown()
 
 
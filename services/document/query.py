@@ -1,7 +1,26 @@
+import heapq
+
+
 def query_results(index, query, min_score=0.80, top_k=10):
-    retriever = index.as_retriever(similarity_top_k=top_k)
+    # 超采样4倍候选，按文档取最佳分块后再截断，相同开销下相关性更好
+    retriever = index.as_retriever(similarity_top_k=top_k * 4)
 
     nodes = retriever.retrieve(query)
+
+    # 按uuid分组，每个文档只保留得分最高的分块
+    best_nodes = {}
+    for node in nodes:
+        if node.score is None or node.score <= min_score:
+            continue
+
+        uuid = node.metadata["uuid"]
+        best = best_nodes.get(uuid)
+        if best is None or node.score > best.score:
+            best_nodes[uuid] = node
+
+    top_nodes = heapq.nlargest(top_k, best_nodes.values(),
+                               key=lambda node: node.score)
+
     results = [
         {
             "uuid": node.metadata["uuid"],
@@ -11,7 +30,7 @@ def query_results(index, query, min_score=0.80, top_k=10):
             "content": node.text,
             "score": node.score,
         }
-        for node in nodes if node.score > min_score
+        for node in top_nodes
     ]
 
     return results
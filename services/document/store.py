@@ -1,48 +1,97 @@
+import asyncio
+
 from llama_index.legacy import Document, VectorStoreIndex
 from llama_index.legacy.node_parser import SimpleNodeParser
-from services.vdb.zilliz import get_storage_context
+from llama_index.legacy.schema import MetadataMode
+from services.vdb.zilliz import get_vector_store
 from services.llm.openai import get_service_context
-from utils.hash import md5
+from components.log import log
+from utils.hash import xxh128
+
+
+# 模块级节点解析器：复用同一实例，避免每次调用重建分词器
+_parser = SimpleNodeParser.from_defaults(chunk_size=1024, chunk_overlap=20)
+
+# 模块级持久向量索引：基于Zilliz集合只构建一次，每次查询只插入新节点
+_index = None
 
+# 已入库文档的uuid集合，用于跳过重复插入（按uuid幂等）
+_stored_uuids = set()
 
-def store_results(results):
+
+def get_index(service_context):
     """
-    将搜索结果存储到向量数据库中
-    
-    该方法接收搜索结果列表，将每个结果转换为Document对象，
-    然后将这些文档分块并创建向量索引。最终返回创建的索引对象，
-    该索引可用于后续的相似性搜索。
+    获取模块级持久向量索引
+
+    该方法在首次调用时基于Zilliz向量存储构建索引对象，
+    之后直接复用。集合上的ANN索引由Zilliz维护，无需在
+    每次查询时重新构建。
     """
-    documents = []
-    for result in results:
-        document = build_document(result=result)
-        documents.append(document)
-
-        print(
-            "build index for result: ",
-            result["title"],
-            result["link"],
-            len(documents),
+    global _index
+    if _index is None:
+        _index = VectorStoreIndex.from_vector_store(
+            vector_store=get_vector_store(),
+            service_context=service_context,
         )
 
-    nodes = build_nodes(documents=documents)
-    print("nodes count", len(nodes), len(documents))
+    return _index
 
-    # index = VectorStoreIndex(nodes)
-    # index.storage_context.persist(persist_dir="./storage")
 
-    storage_context = get_storage_context()
+async def store_results(results):
+    """
+    将搜索结果存储到向量数据库中
+
+    该方法接收搜索结果列表，将每个结果转换为Document对象，
+    跳过已入库的文档，然后将新文档分块、批量计算嵌入向量并
+    插入持久索引。最终返回索引对象，该索引可用于后续的
+    相似性搜索。
+    """
+    documents = [
+        document
+        for result in results
+        if (document := build_document(result=result)) is not None
+    ]
+
+    # 只插入尚未入库的文档，避免重复分块和嵌入
+    documents = [d for d in documents if d.doc_id not in _stored_uuids]
+
     service_context = get_service_context()
+    index = get_index(service_context=service_context)
 
-    index = VectorStoreIndex(nodes=nodes,
-                             storage_context=storage_context,
-                             service_context=service_context)
+    if documents:
+        # 节点解析（分词+分块）是CPU操作，放到线程池执行，避免阻塞事件循环
+        nodes = await asyncio.to_thread(build_nodes, documents)
+        log.debug(f"nodes count: {len(nodes)}, documents count: {len(documents)}")
 
-    print("build index ok", storage_context)
+        # 批量异步计算节点向量：一次嵌入请求携带多个文本，
+        # 避免插入时的逐节点同步嵌入
+        await embed_nodes(nodes=nodes, embed_model=service_context.embed_model)
+
+        index.insert_nodes(nodes)
+        _stored_uuids.update(d.doc_id for d in documents)
 
     return index
 
 
+async def embed_nodes(nodes, embed_model):
+    """
+    批量计算节点的嵌入向量
+
+    该方法一次性提取所有节点的嵌入文本，通过异步批量接口
+    向嵌入服务发起请求，并把返回的向量写回节点。预先写入的
+    向量会被VectorStoreIndex直接复用，不再逐节点重新计算。
+    """
+    texts = [node.get_content(metadata_mode=MetadataMode.EMBED)
+             for node in nodes]
+
+    embeddings = await embed_model.aget_text_embedding_batch(texts)
+
+    for node, embedding in zip(nodes, embeddings):
+        node.embedding = embedding
+
+    return nodes
+
+
 def build_document(result):
     """
     将搜索结果转换为Document对象
@@ -58,7 +107,7 @@ def build_document(result):
     if "uuid" in result:
         uuid = result["uuid"]
     else:
-        uuid = md5(result["link"])
+        uuid = xxh128(result["link"])
 
     text = result["snippet"]
     if "content" in result and len(result["content"]) > len(result["snippet"]):
@@ -86,12 +135,10 @@ def build_nodes(documents):
     """
     将Document对象列表转换为节点列表
     
-    该方法使用SimpleNodeParser将Document对象分割成更小的节点，
-    这些节点是向量索引的基本单位。分割成更小的节点有助于提高
-    检索的精度和效率。
+    该方法使用模块级的SimpleNodeParser将Document对象分割成
+    更小的节点，这些节点是向量索引的基本单位。分割成更小的
+    节点有助于提高检索的精度和效率。
     """
-    parser = SimpleNodeParser.from_defaults(chunk_size=1024, chunk_overlap=20)
-
-    nodes = parser.get_nodes_from_documents(documents=documents, show_progress=True)
+    nodes = _parser.get_nodes_from_documents(documents=documents, show_progress=False)
 
     return nodes
@@ -1,9 +1,11 @@
 import os
+from functools import lru_cache
 from llama_index.llms.openai import OpenAI
 from llama_index.embeddings.openai import OpenAIEmbedding
 from llama_index.core import ServiceContext
 
 
+@lru_cache(maxsize=1)
 def get_service_context():
     api_key = os.getenv("OPENAI_API_KEY")
     api_base = os.getenv("OPENAI_BASE_URL")
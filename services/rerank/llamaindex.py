@@ -1,13 +1,31 @@
-from services.document.store import store_results
+import asyncio
+
+from llama_index.legacy import VectorStoreIndex
+from services.document.store import build_document, build_nodes, embed_nodes
 from services.document.query import query_results
+from services.llm.openai import get_service_context
 
 
-def get_rerank_results(query, search_results):
+async def get_rerank_results(query, search_results):
     try:
-        index = store_results(results=search_results)
+        documents = [
+            document
+            for result in search_results
+            if (document := build_document(result=result)) is not None
+        ]
+
+        service_context = get_service_context()
+
+        nodes = await asyncio.to_thread(build_nodes, documents)
+        await embed_nodes(nodes=nodes, embed_model=service_context.embed_model)
+
+        # 重排序需要针对本次请求的结果打分，使用一次性的内存索引，
+        # 避免共享的持久集合中历史文档挤占top-k名额、留下0分结果
+        index = VectorStoreIndex(nodes=nodes, service_context=service_context)
+
         rerank_results = query_results(index, query, 0.00, len(search_results))
     except Exception as e:
         print(f"reranking search results failed: {e}")
         raise e
-    
-    return rerank_results
\ No newline at end of file
+
+    return rerank_results
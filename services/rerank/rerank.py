@@ -3,12 +3,12 @@ from services.rerank.llamaindex import get_rerank_results as get_rerank_llamaind
 from services.rerank.flashrank import get_rerank_results as get_rerank_flashrank
 
 
-def rerank(search_results, query):
+async def rerank(search_results, query):
     rerank_method = os.getenv("RERANK_METHOD")
     if not rerank_method or rerank_method == "flash_rank":
         rerank_results = get_rerank_flashrank(query, search_results)
     elif rerank_method == "llama_index":
-        rerank_results = get_rerank_llamaindex(query, search_results)
+        rerank_results = await get_rerank_llamaindex(query, search_results)
     else:
         print(f"rerank failed: unknown rerank_method: {rerank_method}")
         return search_results
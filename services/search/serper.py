@@ -1,7 +1,7 @@
 import os
 import requests
 from components.log import log
-from utils.hash import md5
+from utils.hash import xxh128
 
 
 def get_search_results(params):
@@ -20,7 +20,7 @@ def get_search_results(params):
 
         results = []
         for item in items:
-            item["uuid"] = md5(item["link"])
+            item["uuid"] = xxh128(item["link"])
             item["score"] = 0.00
 
             results.append(item)
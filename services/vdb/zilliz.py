@@ -1,8 +1,10 @@
 import os
+from functools import lru_cache
 from llama_index.legacy.vector_stores import MilvusVectorStore
 from llama_index.legacy.storage import StorageContext
 
 
+@lru_cache(maxsize=1)
 def get_vector_store():
     uri = os.getenv("ZILLIZ_URI")
     token = os.getenv("ZILLIZ_TOKEN")
@@ -10,12 +12,26 @@ def get_vector_store():
     collection = os.getenv("ZILLIZ_COLLECTION")
 
     vector_store = MilvusVectorStore(
-        uri=uri, token=token, collection_name=collection, dim=dim, overwrite=False
+        uri=uri,
+        token=token,
+        collection_name=collection,
+        dim=dim,
+        overwrite=False,
+        # 扁平结构：legacy版本取出index_type后，其余键直接作为索引构建参数；
+        # 度量方式由similarity_metric决定（缺省IP），不在此处指定
+        index_config={"index_type": "IVF_SQ8", "nlist": 1024},
+        search_config={"params": {"nprobe": 16}},
     )
 
+    # legacy版本在overwrite=False时不会替换集合自动创建的默认索引，
+    # 这里强制重建一次，使index_config真正生效；lru_cache保证只执行一次，
+    # search_config中的nprobe也因此与实际存在的索引类型对齐
+    vector_store._create_index_if_required(force=True)
+
     return vector_store
 
 
+@lru_cache(maxsize=1)
 def get_storage_context():
     vector_store = get_vector_store()
     storage_context = StorageContext.from_defaults(vector_store=vector_store)
@@ -1,92 +1,187 @@
-# 导入html2text库，用于将HTML转换为Markdown格式
-import html2text
+# 导入selectolax的HTML解析器（基于C语言的lexbor引擎），用于快速提取网页文本
+from selectolax.parser import HTMLParser
 # 导入asyncio库，用于支持异步编程
 import asyncio
+# 导入logging库，用于判断日志级别
+import logging
 # 导入aiohttp库，用于异步HTTP请求
 import aiohttp
-# 导入re库，用于正则表达式操作
-import re
+# 导入类型提示相关的模块
+from typing import Optional
+# 导入带TTL的LRU缓存，用于缓存已抓取的网页内容
+from cachetools import TTLCache
+# 导入磁盘缓存，用于持久保存网页正文和HTTP校验头
+from diskcache import Cache
+# 导入日志组件
+from components.log import log
+
+
+# 模块级共享的HTTP客户端会话，跨请求复用TCP连接和DNS缓存
+_session: Optional[aiohttp.ClientSession] = None
+
+# 限制并发抓取数量，避免单次批量抓取打开过多套接字
+_fetch_semaphore = asyncio.Semaphore(8)
+
+# 单个URL的抓取超时（秒），避免慢速URL拖累整个批次的尾延迟
+FETCH_TIMEOUT = 10
+
+# 已抓取内容的TTL缓存：相同URL在10分钟内重复出现时跳过网络请求和解析
+_content_cache: TTLCache = TTLCache(maxsize=1024, ttl=600)
+
+# URL级磁盘缓存：按URL保存(etag, last_modified, html)，用于HTTP条件GET
+_url_cache = Cache("./.urlcache")
+
+# 基础请求头：声明支持压缩传输以减少传输字节数（aiohttp自动解压）
+_base_headers = {"Accept-Encoding": "gzip, deflate"}
+
+
+async def get_session():
+    """获取模块级共享的aiohttp会话，首次调用时惰性创建"""
+    global _session
+    # 如果会话不存在或已关闭，创建新会话
+    if _session is None or _session.closed:
+        # 配置连接池：限制总连接数和单主机连接数，缓存DNS解析结果，保持长连接
+        connector = aiohttp.TCPConnector(
+            limit=100,
+            limit_per_host=10,
+            ttl_dns_cache=300,
+            keepalive_timeout=30,
+            enable_cleanup_closed=True,
+        )
+        # 配置超时：总超时15秒，连接超时5秒
+        timeout = aiohttp.ClientTimeout(total=15, connect=5)
+        _session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+    return _session
+
+
+async def close_session():
+    """关闭共享会话，应在应用关闭时调用"""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
 
 
 async def fetch_url(session, url):
-    """异步获取指定URL的HTML内容"""
+    """异步获取指定URL的HTML内容，支持HTTP条件GET"""
+    headers = dict(_base_headers)
+    # 查找磁盘缓存：命中时带上校验头发起条件GET
+    cached = _url_cache.get(url)
+    if cached:
+        etag, last_modified, _ = cached
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
     # 使用session异步发送GET请求到指定URL
-    async with session.get(url) as response:
+    async with session.get(url, headers=headers) as response:
         try:
-            # 检查HTTP响应状态，如果不是200则抛出异常
-            response.raise_for_status()
-            # 设置响应编码为utf-8
-            response.encoding = 'utf-8'
-            # 异步获取响应文本内容
-            html = await response.text()
+            # 304表示内容未变化，直接返回缓存的正文，省去传输和解析
+            if response.status == 304 and cached:
+                return cached[2]
+
+            # 检查HTTP响应状态，错误状态直接返回空字符串，避免热路径上的异常开销
+            if response.status >= 400:
+                log.warning(f"fetch url failed: {url}: status {response.status}")
+                return ""
+
+            # 读取原始字节内容
+            raw = await response.read()
+            # 按响应头声明的字符集解码，缺省utf-8；errors='replace'避免解码异常
+            # 这样跳过了response.text()在缺少charset时的字符集探测
+            html = raw.decode(response.charset or 'utf-8', errors='replace')
+
+            # 响应携带校验头时更新磁盘缓存，供下次条件GET使用
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+            if html and (etag or last_modified):
+                _url_cache.set(url, (etag, last_modified, html))
 
             # 返回获取到的HTML内容
             return html
         except Exception as e:
             # 捕获并打印任何异常
-            print(f"fetch url failed: {url}: {e}")
+            log.warning(f"fetch url failed: {url}: {e}")
             # 发生异常时返回空字符串
             return ""
 
 
-async def html_to_markdown(html):
-    """将HTML内容转换为Markdown格式"""
+def extract_text(html):
+    """从HTML内容中提取纯文本"""
     try:
-        # 创建HTML2Text实例
-        h = html2text.HTML2Text()
-        # 设置忽略链接
-        h.ignore_links = True
-        # 设置忽略图片
-        h.ignore_images = True
-
-        # 将HTML转换为Markdown
-        markdown = h.handle(html)
-
-        # 返回转换后的Markdown文本
-        return markdown
+        # 解析HTML并定位body节点
+        body = HTMLParser(html).body
+        # 页面没有body时返回空字符串
+        if body is None:
+            return ""
+
+        # 提取文本：各节点间以换行符分隔，strip=True去除空白片段
+        text = body.text(separator='\n', strip=True)
+
+        # 过滤剩余的空行（C层面的单次遍历，比正则回溯更快）
+        return "\n".join(filter(None, text.split("\n")))
     except Exception as e:
         # 捕获并打印任何异常
-        print(f"html to markdown failed: {e}")
+        log.warning(f"extract text failed: {e}")
         # 发生异常时返回空字符串
         return ""
 
 
 async def fetch_markdown(session, url):
-    """获取URL内容并转换为Markdown格式"""
+    """获取URL内容并提取纯文本"""
     try:
-        # 获取URL的HTML内容
-        html = await fetch_url(session, url)
-        # 将HTML转换为Markdown
-        markdown = await html_to_markdown(html)
-        # 使用正则表达式将连续的多个换行符替换为单个换行符
-        # 注意：这里有语法错误，\n{2,n}中的n应该是一个数字，正确的应该是\n{2,}
-        markdown = re.sub(r'\n{2,}', '\n', markdown)
-
-        # 返回URL和对应的Markdown内容
+        # 获取URL的HTML内容（信号量限制并发数，超时限制单URL耗时）
+        async with _fetch_semaphore:
+            html = await asyncio.wait_for(fetch_url(session, url),
+                                          timeout=FETCH_TIMEOUT)
+        # 从HTML中提取纯文本（CPU操作，放到线程池执行，避免阻塞事件循环）
+        markdown = await asyncio.to_thread(extract_text, html)
+
+        # 返回URL和对应的文本内容
         return url, markdown
     except Exception as e:
         # 捕获并打印任何异常
-        print(f"fetch markdown failed: {url}: {e}")
+        log.warning(f"fetch markdown failed: {url}: {e}")
         # 发生异常时返回URL和空字符串
         return url, ""
 
 
 async def batch_fetch_urls(urls):
     """批量获取多个URL的Markdown内容"""
-    # 打印要处理的URL列表
-    print("urls", urls)
+    # 调试级别记录要处理的URL列表，避免生产环境热路径上的stdout开销
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug(f"batch fetch urls: {urls}")
     try:
-        # 创建异步HTTP客户端会话
-        async with aiohttp.ClientSession() as session:
-            # 为每个URL创建一个获取Markdown的任务
-            tasks = [fetch_markdown(session, url) for url in urls]
-            # 并行执行所有任务
-            results = await asyncio.gather(*tasks, return_exceptions=False)
-
-            # 返回所有URL的处理结果
-            return results
+        # 去重URL列表，保持原有顺序
+        urls = list(dict.fromkeys(urls))
+        # 只抓取缓存未命中的URL
+        misses = [url for url in urls if url not in _content_cache]
+
+        # 本次抓取到的内容映射
+        fetched = {}
+        if misses:
+            # 复用模块级共享会话，避免每次批量抓取都重建TCP+TLS连接
+            session = await get_session()
+            # 为每个未命中的URL创建一个获取Markdown的任务
+            tasks = [fetch_markdown(session, url) for url in misses]
+            # 并行执行所有任务，单个任务的异常不影响整个批次
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+
+            for url, result in zip(misses, results):
+                # 异常任务降级为空内容，保持批次结果完整
+                content = "" if isinstance(result, BaseException) else result[1]
+                fetched[url] = content
+                # 只缓存非空内容，抓取失败的URL下次仍会重试
+                if content:
+                    _content_cache[url] = content
+
+        # 按原始URL顺序返回，缓存命中的直接使用缓存内容
+        return [(url, _content_cache.get(url, fetched.get(url, "")))
+                for url in urls]
     except aiohttp.ClientResponseError as e:
         # 捕获并打印HTTP客户端响应异常
-        print(f"batch fetch urls failed: {e}")
+        log.error(f"batch fetch urls failed: {e}")
         # 发生异常时返回空列表
         return []
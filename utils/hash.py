@@ -1,5 +1,7 @@
 import hashlib
 
+import xxhash
+
 
 def md5(data: str):
     _md5 = hashlib.md5()
@@ -7,3 +9,9 @@ def md5(data: str):
     _hash = _md5.hexdigest()
 
     return _hash
+
+
+def xxh128(data: str):
+    _hash = xxhash.xxh128_hexdigest(data.encode("utf-8"))
+
+    return _hash